@@ -0,0 +1,47 @@
+"""
+Time ``PySourceBuilder.block`` against the generator based context manager
+it replaced. Run from the root of the repository::
+
+    python benchmarks/block.py
+
+"""
+from __future__ import with_statement
+import os
+import sys
+import timeit
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sourcebuilder import PySourceBuilder
+
+BLOCKS = 1000
+NUMBER = 20
+REPEAT = 5
+
+
+class GeneratorPySourceBuilder(PySourceBuilder):
+
+    @contextmanager
+    def block(self, code, lines_before=0):
+        for i in range(lines_before):
+            self.writeln()
+        self.writeln(code)
+        with self.indent:
+            yield
+
+
+def bench(sb):
+    def run():
+        for i in range(BLOCKS):
+            with sb.block('if x:', 1):
+                with sb.block('for y in z:'):
+                    sb.writeln('pass')
+        sb.truncate()
+    best = min(timeit.repeat(run, number=NUMBER, repeat=REPEAT))
+    return best / (BLOCKS * 2 * NUMBER) * 1e6
+
+
+if __name__ == '__main__':
+    print 'generator: %.2fus per block' % bench(GeneratorPySourceBuilder())
+    print 'Block:     %.2fus per block' % bench(PySourceBuilder())
@@ -1,2 +1,7 @@
 from .sourcebuilder import DedentException, SourceBuilder
 from .pysourcebuilder import PySourceBuilder
+from .buffers import InternedBuffer, RopeBuffer
+from .sinks import CompressedSink, Sink
+from .template import TemplateSyntaxError, compile_template, render
+from .filters import (CollapseBlankLines, LineLengthCheck,
+                      normalize_line_endings, strip_trailing_whitespace)
@@ -0,0 +1,149 @@
+"""
+Alternative buffers for the SourceBuilder. A buffer is anything that has
+``write``, ``getvalue`` and ``close`` methods and a ``closed`` attribute,
+``cStringIO.StringIO`` being the default. Buffers can also provide a
+``write_to`` method to write their contents to a file without building the
+complete source in memory first.
+
+"""
+from array import array
+
+WRITE_TO_LINES = 4096
+
+
+class Mark(object):
+    """
+    A position in a ``RopeBuffer``, as returned by ``SourceBuilder.mark``.
+    Remembers the indentation level at the time it was made.
+
+    """
+    def __init__(self, level=0):
+        self.level = level
+        self.chunks = []
+
+
+class RopeBuffer(object):
+    """
+    A buffer that allows text to be inserted at earlier positions.
+
+    The buffer is kept as a list of segments. Making a mark closes the
+    current segment and adds the (initially empty) segment of the mark,
+    writes continue in a new segment after it. Inserting at a mark appends
+    to its segment, so it's as cheap as a regular write. The segments are
+    joined in a single pass by ``getvalue``.
+
+    """
+    def __init__(self):
+        self._current = []
+        self._segments = [self._current]
+        self.closed = False
+
+    def write(self, data):
+        """Append ``data`` to the buffer."""
+        self._current.append(data)
+
+    def mark(self, level=0):
+        """
+        Return a ``Mark`` for the current position, ``level`` is the
+        indentation level to be recorded on the mark.
+
+        """
+        mark = Mark(level)
+        self._current = []
+        self._segments.append(mark.chunks)
+        self._segments.append(self._current)
+        return mark
+
+    def insert(self, mark, data):
+        """
+        Insert ``data`` at ``mark``, after any data inserted at the same
+        mark before.
+
+        """
+        mark.chunks.append(data)
+
+    def getvalue(self):
+        """Return the contents of the buffer."""
+        return ''.join([''.join(segment) for segment in self._segments])
+
+    def write_to(self, fileobj):
+        """Write the contents of the buffer to ``fileobj``."""
+        for segment in self._segments:
+            fileobj.write(''.join(segment))
+
+    def close(self):
+        """Discard the contents of the buffer."""
+        self._current = []
+        self._segments = [self._current]
+        self.closed = True
+
+
+class InternedBuffer(object):
+    """
+    A buffer that stores each distinct line only once.
+
+    Complete lines are looked up in (or added to) a pool of lines, the
+    document itself is an ``array('I')`` of line ids. Generated code that
+    repeats the same lines over and over takes up a fraction of the memory
+    it would take in a regular buffer. A line that isn't complete yet is
+    kept aside until its newline is written.
+
+    """
+    def __init__(self):
+        self._ids = {}
+        self._pool = []
+        self._doc = array('I')
+        self._pending = []
+        self.closed = False
+
+    def write(self, data):
+        """Append ``data`` to the buffer."""
+        self._pending.append(data)
+        if '\n' not in data:
+            return
+        lines = ''.join(self._pending).split('\n')
+        rest = lines.pop()
+        self._pending = rest and [rest] or []
+        ids, pool, append = self._ids, self._pool, self._doc.append
+        for line in lines:
+            line_id = ids.get(line)
+            if line_id is None:
+                line_id = ids[line] = len(pool)
+                pool.append(line + '\n')
+            append(line_id)
+
+    @property
+    def dedup_ratio(self):
+        """
+        The number of lines in the buffer divided by the number of distinct
+        lines stored.
+
+        """
+        if not self._pool:
+            return 1.0
+        return len(self._doc) / float(len(self._pool))
+
+    def getvalue(self):
+        """Return the contents of the buffer."""
+        pool = self._pool
+        return ''.join([pool[i] for i in self._doc] + self._pending)
+
+    def write_to(self, fileobj):
+        """
+        Write the contents of the buffer to ``fileobj``, expanding
+        ``WRITE_TO_LINES`` lines at a time.
+
+        """
+        pool, doc = self._pool, self._doc
+        for start in xrange(0, len(doc), WRITE_TO_LINES):
+            fileobj.write(''.join([pool[i] for i in
+                                   doc[start:start + WRITE_TO_LINES]]))
+        fileobj.write(''.join(self._pending))
+
+    def close(self):
+        """Discard the contents of the buffer and the line pool."""
+        self._ids = {}
+        self._pool = []
+        self._doc = array('I')
+        self._pending = []
+        self.closed = True
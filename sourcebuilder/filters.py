@@ -0,0 +1,229 @@
+"""
+Line filters for the SourceBuilder. A filter is a callable that's given
+each line written (without its newline) and returns the line to write,
+or ``None`` to drop it. Filters run as lines are written, before they
+reach the buffer or sink.
+
+"""
+
+
+class FilteredBuffer(object):
+    """
+    Wraps a buffer, passes complete lines through ``filters`` before
+    writing them to the buffer. A line that isn't complete yet is kept
+    aside until its newline is written, or until the contents of the
+    buffer are requested.
+
+    Filters that have a ``reset`` method are reset when the buffer is
+    created. Filters that keep state should have ``getstate`` and
+    ``setstate`` methods, so the (JSON serializable) state can be saved in
+    checkpoints. Other attributes are looked up on the wrapped buffer.
+
+    """
+    def __init__(self, buffer, filters):
+        self.buffer = buffer
+        self.filters = filters
+        self._pending = []
+        for stage in filters:
+            if hasattr(stage, 'reset'):
+                stage.reset()
+
+    def __getattr__(self, name):
+        return getattr(self.buffer, name)
+
+    def write(self, data):
+        """Append ``data`` to the buffer, filtering any complete lines."""
+        self._pending.append(data)
+        if '\n' not in data:
+            return
+        lines = ''.join(self._pending).split('\n')
+        rest = lines.pop()
+        self._pending = rest and [rest] or []
+        lines = self._filter(lines)
+        if lines:
+            lines.append('')
+            self.buffer.write('\n'.join(lines))
+
+    def flush(self):
+        """Filter and write the pending incomplete line, if any."""
+        if self._pending:
+            lines = self._filter([''.join(self._pending)])
+            self._pending = []
+            if lines:
+                self.buffer.write(lines[0])
+
+    def mark(self, level=0):
+        """
+        Inserting text at earlier positions is not supported, raises a
+        ``TypeError``.
+
+        """
+        raise TypeError('Filtered buffers do not support marks.')
+
+    def insert(self, mark, data):
+        """
+        Inserting text at earlier positions is not supported, raises a
+        ``TypeError``.
+
+        """
+        raise TypeError('Can not insert into a filtered buffer.')
+
+    def start_region(self, name):
+        """
+        Start fingerprint region ``name`` on the wrapped buffer.
+
+        Raises a ``ValueError`` if a line is incomplete.
+
+        """
+        self._check_line_start('Fingerprint region boundaries')
+        self.buffer.start_region(name)
+
+    def end_region(self, name):
+        """
+        End fingerprint region ``name`` on the wrapped buffer.
+
+        Raises a ``ValueError`` if a line is incomplete.
+
+        """
+        self._check_line_start('Fingerprint region boundaries')
+        self.buffer.end_region(name)
+
+    def getstate(self):
+        """
+        Return the state of the filters, for checkpoints.
+
+        Raises a ``ValueError`` if a line is incomplete.
+
+        """
+        self._check_line_start('Checkpoints')
+        states = []
+        for stage in self.filters:
+            if hasattr(stage, 'getstate'):
+                states.append(stage.getstate())
+            else:
+                states.append(None)
+        return states
+
+    def setstate(self, states):
+        """Restore the state of the filters, as returned by ``getstate``."""
+        for stage, state in zip(self.filters, states):
+            if hasattr(stage, 'setstate'):
+                stage.setstate(state)
+
+    def getvalue(self):
+        """Flush and return the contents of the wrapped buffer."""
+        self.flush()
+        return self.buffer.getvalue()
+
+    def write_to(self, fileobj):
+        """
+        Flush and write the contents of the wrapped buffer to ``fileobj``.
+
+        """
+        self.flush()
+        write_to = getattr(self.buffer, 'write_to', None)
+        if write_to is None:
+            fileobj.write(self.buffer.getvalue())
+        else:
+            write_to(fileobj)
+
+    def close(self):
+        """Flush and close the wrapped buffer."""
+        self.flush()
+        self.buffer.close()
+
+    def _check_line_start(self, what):
+        if self._pending:
+            raise ValueError('%s are only allowed at the start of a line '
+                             'when filters are used.' % what)
+
+    def _filter(self, lines):
+        filtered = []
+        append = filtered.append
+        filters = self.filters
+        for line in lines:
+            for stage in filters:
+                line = stage(line)
+                if line is None:
+                    break
+            else:
+                append(line)
+        return filtered
+
+
+def strip_trailing_whitespace(line):
+    """Remove whitespace from the end of the line."""
+    return line.rstrip()
+
+
+def normalize_line_endings(line):
+    """
+    Remove carriage returns from the end of the line, so lines end in
+    ``\\n`` only.
+
+    """
+    return line.rstrip('\r')
+
+
+class CollapseBlankLines(object):
+    """
+    Drop blank lines following a run of ``max_blank`` blank lines. Lines
+    containing only whitespace count as blank.
+
+    """
+    def __init__(self, max_blank=2):
+        self.max_blank = max_blank
+        self.blank = 0
+
+    def __call__(self, line):
+        if line.strip():
+            self.blank = 0
+            return line
+        self.blank = self.blank + 1
+        if self.blank <= self.max_blank:
+            return line
+
+    def reset(self):
+        """Forget about preceding blank lines."""
+        self.blank = 0
+
+    def getstate(self):
+        """Return the number of preceding blank lines."""
+        return self.blank
+
+    def setstate(self, state):
+        """Set the number of preceding blank lines."""
+        self.blank = state
+
+
+class LineLengthCheck(object):
+    """
+    Flag lines longer than ``max_length`` characters. The lines are passed
+    on unchanged, ``violations`` is a list of ``(lineno, length)`` tuples
+    for the lines that are too long. Line numbers start at 1.
+
+    """
+    def __init__(self, max_length=79):
+        self.max_length = max_length
+        self.lineno = 0
+        self.violations = []
+
+    def __call__(self, line):
+        self.lineno = self.lineno + 1
+        if len(line) > self.max_length:
+            self.violations.append((self.lineno, len(line)))
+        return line
+
+    def reset(self):
+        """Start counting lines from the top and forget any violations."""
+        self.lineno = 0
+        self.violations = []
+
+    def getstate(self):
+        """Return the current line number and the violations."""
+        return self.lineno, list(self.violations)
+
+    def setstate(self, state):
+        """Set the current line number and the violations."""
+        self.lineno, violations = state
+        self.violations = [tuple(violation) for violation in violations]
@@ -0,0 +1,116 @@
+"""
+Fingerprint the generated source while it's written, so it doesn't have to
+be read again to hash it.
+
+"""
+import hashlib
+from .filters import FilteredBuffer
+
+ENCODING = 'utf-8'
+
+
+class HashingBuffer(object):
+    """
+    Wraps a buffer, updates a running hash of everything written to it.
+    ``algorithm`` is the name of a ``hashlib`` algorithm, or a callable
+    returning a new hash object (e.g. ``xxhash.xxh64``). Unicode is encoded
+    using ``encoding`` before it's hashed.
+
+    Named regions get a hash of their own, covering what's written between
+    ``start_region`` and ``end_region``. Other attributes are looked up on
+    the wrapped buffer.
+
+    """
+    def __init__(self, buffer, algorithm='sha256', encoding=ENCODING):
+        self.buffer = buffer
+        if callable(algorithm):
+            self._new = algorithm
+        else:
+            self._new = lambda: hashlib.new(algorithm)
+        self.encoding = encoding
+        self._hash = self._new()
+        self._regions = {}
+        self._active = []
+
+    def __getattr__(self, name):
+        return getattr(self.buffer, name)
+
+    def write(self, data):
+        """Append ``data`` to the buffer and update the hashes."""
+        self.buffer.write(data)
+        if isinstance(data, unicode):
+            data = data.encode(self.encoding)
+        self._hash.update(data)
+        for name, region in self._active:
+            region.update(data)
+
+    def mark(self, level=0):
+        """
+        Inserting text at earlier positions is not supported, raises a
+        ``TypeError``.
+
+        """
+        raise TypeError('Fingerprinted buffers do not support marks.')
+
+    def insert(self, mark, data):
+        """
+        Inserting text at earlier positions is not supported, raises a
+        ``TypeError``.
+
+        """
+        raise TypeError('Can not insert into a fingerprinted buffer.')
+
+    def start_region(self, name):
+        """
+        Start hashing what's written as region ``name``, replacing an
+        earlier region of the same name.
+
+        Raises a ``ValueError`` if region ``name`` is already active.
+
+        """
+        for active, region in self._active:
+            if active == name:
+                raise ValueError('Region %r is already active.' % name)
+        region = self._regions[name] = self._new()
+        self._active.append((name, region))
+
+    def end_region(self, name):
+        """Stop hashing what's written as region ``name``."""
+        self._active = [(active, region) for active, region in self._active
+                        if active != name]
+
+    def fingerprint(self, name=None):
+        """
+        Return the hex digest of everything written, or of region ``name``
+        (which may still be active).
+
+        Raises a ``KeyError`` if there's no region called ``name``.
+
+        """
+        if name is None:
+            return self._hash.hexdigest()
+        return self._regions[name].hexdigest()
+
+
+class Region(object):
+    """
+    The context manager returned by ``SourceBuilder.region``, hashes what's
+    written inside the context as region ``name``. If the context is left
+    with an exception the region is ended even if a line is incomplete, so
+    the exception isn't replaced.
+
+    """
+    __slots__ = ('buffer', 'name')
+
+    def __init__(self, buffer, name):
+        self.buffer = buffer
+        self.name = name
+
+    def __enter__(self):
+        self.buffer.start_region(self.name)
+
+    def __exit__(self, *exc_info):
+        buffer = self.buffer
+        if exc_info[0] is not None and isinstance(buffer, FilteredBuffer):
+            buffer = buffer.buffer
+        buffer.end_region(self.name)
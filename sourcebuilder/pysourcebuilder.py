@@ -1,6 +1,5 @@
 from __future__ import with_statement
 import textwrap
-from contextlib import contextmanager
 from sourcebuilder import SourceBuilder
 
 INDENT = ' ' * 4
@@ -8,16 +7,42 @@ TRIPLE_QUOTES = '"' * 3
 DOCSTRING_WIDTH = 72
 
 
+class Block(object):
+    """
+    The context manager returned by ``PySourceBuilder.block``. Entering it
+    writes the blank lines and the code, then raises the indentation level.
+    Exiting it decreases the indentation level again. It can be entered
+    more than once, writing the code every time.
+
+    """
+    __slots__ = ('builder', 'code', 'blank_lines')
+
+    def __init__(self, builder, code, lines_before=0):
+        self.builder = builder
+        self.code = code
+        self.blank_lines = '\n' * lines_before
+
+    def __enter__(self):
+        builder = self.builder
+        if self.blank_lines:
+            builder.buffer.write(self.blank_lines)
+        builder.writeln(self.code)
+        builder.indent.indent()
+
+    def __exit__(self, *exc_info):
+        self.builder.indent.dedent()
+
+
 class PySourceBuilder(SourceBuilder):
     """
     A special SourceBuilder that provides some convenience context managers
     for writing well formatted Python code.
 
     """
-    def __init__(self, indent_with=INDENT):
-        super(PySourceBuilder, self).__init__(indent_with=indent_with)
+    def __init__(self, indent_with=INDENT, **kwargs):
+        super(PySourceBuilder, self).__init__(indent_with=indent_with,
+                                              **kwargs)
 
-    @contextmanager
     def block(self, code, lines_before=0):
         """
         A context manager for block structures. It's a generic way to start a
@@ -45,11 +70,7 @@ class PySourceBuilder(SourceBuilder):
                     pass
 
         """
-        for i in range(lines_before):
-            self.writeln()
-        self.writeln(code)
-        with self.indent:
-            yield
+        return Block(self, code, lines_before)
 
     def docstring(self, doc, delimiter=TRIPLE_QUOTES, width=DOCSTRING_WIDTH):
         """
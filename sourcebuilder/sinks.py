@@ -0,0 +1,225 @@
+"""
+Sinks are buffers that stream the generated source to a file-like object
+as it's written, instead of keeping all of it in memory. Writes are
+collected until ``chunk_size`` characters are pending, which are then
+encoded and passed on in one go.
+
+To write to a file pass a factory for the sink as the ``buffer`` of the
+SourceBuilder, e.g. ``functools.partial(CompressedSink, f, 'gzip')``.
+Without a file-like object the (compressed) output is kept in memory.
+
+"""
+import zlib
+try:
+    from cStringIO import StringIO
+except ImportError:  # pragma: no cover
+    from StringIO import StringIO
+try:
+    import lzma
+except ImportError:  # pragma: no cover
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+
+CHUNK_SIZE = 64 * 1024
+ENCODING = 'utf-8'
+
+
+class Sink(object):
+    """
+    Streams the source to ``fileobj`` in chunks of ``chunk_size``
+    characters. Unicode is encoded using ``encoding``.
+
+    ``start`` is the position in ``fileobj`` the sink started writing at
+    (``None`` if ``fileobj`` can't tell), ``offset`` is the position the
+    sink has written up to.
+
+    """
+    def __init__(self, fileobj=None, chunk_size=CHUNK_SIZE,
+                 encoding=ENCODING):
+        self.in_memory = fileobj is None
+        if self.in_memory:
+            fileobj = StringIO()
+        self.fileobj = fileobj
+        try:
+            self.start = fileobj.tell()
+        except (AttributeError, IOError):
+            self.start = None
+        self.chunk_size = chunk_size
+        self.encoding = encoding
+        self.offset = self.start or 0
+        self.finished = False
+        self.closed = False
+        self._pending = []
+        self._size = 0
+
+    def write(self, data):
+        """
+        Append ``data`` to the pending chunk, flushes the chunk if it has
+        grown to ``chunk_size``.
+
+        Raises a ``ValueError`` if the sink is already finished.
+
+        """
+        if self.finished:
+            raise ValueError('Sink is already finished.')
+        self._pending.append(data)
+        self._size = self._size + len(data)
+        if self._size >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Encode the pending chunk and pass it on."""
+        if self.finished:
+            raise ValueError('Sink is already finished.')
+        data = ''.join(self._pending)
+        self._pending = []
+        self._size = 0
+        if isinstance(data, unicode):
+            data = data.encode(self.encoding)
+        self._output(self.encode(data))
+
+    def encode(self, data):
+        """
+        Hook for subclasses to transform an encoded chunk before it's
+        written.
+
+        """
+        return data
+
+    def finish(self):
+        """
+        Flush the pending chunk and anything else that's held back.
+        Nothing can be written after a sink is finished.
+
+        """
+        if not self.finished:
+            self.flush()
+            self.finished = True
+
+    def getvalue(self):
+        """
+        Finish the sink. Returns the output if it's kept in memory,
+        ``None`` otherwise.
+
+        """
+        self.finish()
+        if self.in_memory:
+            return self.fileobj.getvalue()
+
+    def write_to(self, fileobj):
+        """
+        Finish the sink and write the output to ``fileobj``.
+
+        Raises a ``TypeError`` if the output isn't kept in memory, it has
+        been written to the sink's own file-like object already.
+
+        """
+        if not self.in_memory:
+            raise TypeError('Output of the sink was written to its own file.')
+        fileobj.write(self.getvalue())
+
+    def checkpoint(self):
+        """
+        Flush the pending chunk and ``fileobj``, returns the offset to
+        resume writing at.
+
+        Raises a ``TypeError`` if the output is kept in memory.
+
+        """
+        if self.in_memory:
+            raise TypeError('In memory sinks do not support checkpoints.')
+        self.flush()
+        if hasattr(self.fileobj, 'flush'):
+            self.fileobj.flush()
+        return self.offset
+
+    def resume(self, offset):
+        """
+        Discard anything written to ``fileobj`` after position ``offset``
+        and continue writing from there.
+
+        """
+        self.fileobj.seek(offset)
+        self.fileobj.truncate()
+        self.offset = offset
+
+    def discard(self):
+        """
+        Throw away the pending chunk and anything the sink has written to
+        ``fileobj``, which is truncated back to ``start``. Nothing can be
+        written afterwards.
+
+        Raises a ``TypeError`` if output has been written to a ``fileobj``
+        that can't tell its position.
+
+        """
+        self._pending = []
+        self._size = 0
+        if self.offset != (self.start or 0):
+            if self.start is None:
+                raise TypeError('Can not discard output written to a file '
+                                'that can not tell its position.')
+            self.fileobj.seek(self.start)
+            self.fileobj.truncate()
+            self.offset = self.start
+        self.finished = True
+        self.closed = True
+
+    def close(self):
+        """
+        Finish the sink. The file-like object isn't closed, it's owned by
+        the caller.
+
+        """
+        self.finish()
+        self.closed = True
+
+    def _output(self, data):
+        if data:
+            self.fileobj.write(data)
+            self.offset = self.offset + len(data)
+
+
+class CompressedSink(Sink):
+    """
+    A sink that compresses the source while it's written. ``method`` is
+    one of ``'gzip'``, ``'zlib'`` or ``'lzma'``, ``level`` is the
+    compression level (or lzma preset) to use.
+
+    Raises a ``ValueError`` for an unknown method, or if lzma isn't
+    available.
+
+    """
+    def __init__(self, fileobj=None, method='gzip', level=None, **kwargs):
+        self.method = method
+        self.compressor = self._compressor(method, level)
+        super(CompressedSink, self).__init__(fileobj=fileobj, **kwargs)
+
+    def encode(self, data):
+        return self.compressor.compress(data)
+
+    def checkpoint(self):
+        raise TypeError('Compressed sinks do not support checkpoints.')
+
+    def finish(self):
+        if not self.finished:
+            self.flush()
+            self._output(self.compressor.flush())
+            self.finished = True
+
+    def _compressor(self, method, level):
+        if level is None:
+            level = zlib.Z_DEFAULT_COMPRESSION
+        if method == 'gzip':
+            return zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        if method == 'zlib':
+            return zlib.compressobj(level)
+        if method == 'lzma':
+            if lzma is None:
+                raise ValueError('lzma is not available.')
+            if level == zlib.Z_DEFAULT_COMPRESSION:
+                level = lzma.PRESET_DEFAULT
+            return lzma.LZMACompressor(preset=level)
+        raise ValueError('Unknown compression method %r.' % method)
@@ -2,6 +2,12 @@ try:
     from cStringIO import StringIO
 except ImportError:  # pragma: no cover
     from StringIO import StringIO
+try:
+    import json
+except ImportError:  # pragma: no cover
+    import simplejson as json
+from .filters import FilteredBuffer
+from .fingerprint import HashingBuffer, Region
 
 INDENT = ' ' * 4
 
@@ -19,6 +25,8 @@ class IndentManager(object):
     to provide the indent context manager. And the indent and dedent methods.
 
     """
+    __slots__ = ('indent_with', 'level')
+
     def __init__(self, indent_with=INDENT):
         self.indent_with = indent_with
         self.level = 0
@@ -128,15 +136,32 @@ class SourceBuilder(object):
     with calls to ``sb.dedent()`` or ``sb.indent()``.
 
     """
-    def __init__(self, indent_with=INDENT):
+    def __init__(self, indent_with=INDENT, buffer=StringIO, filters=None,
+                 fingerprint=None):
         """
         Initialize SourceBuilder, ``indent_with`` is set to 4 spaces
-        by default.
+        by default. ``buffer`` is called to create the buffer the source is
+        written to, ``cStringIO.StringIO`` by default. ``filters`` is a list
+        of line filters every line written is passed through. If
+        ``fingerprint`` is given the source is hashed as it's written using
+        that hashlib algorithm (or hash constructor).
 
         """
-        self._out = StringIO()
+        self._buffer = buffer
+        self._filters = filters
+        self._algorithm = fingerprint
+        self._out = self._new_buffer()
+        self._checkpoint = None
         self.indent = IndentManager(indent_with=indent_with)
 
+    @property
+    def buffer(self):
+        """
+        The buffer the source is currently written to.
+
+        """
+        return self._out
+
     def write(self, code):
         """
         Write code at the current indentation level.
@@ -155,6 +180,16 @@ class SourceBuilder(object):
             self.write(code)
         self._out.write('\n')
 
+    def writelines(self, lines):
+        """
+        Write each of the given lines at the current indentation level.
+        Empty lines are written as only a newline.
+
+        """
+        indent = str(self.indent)
+        self._out.write(''.join([line and indent + line + '\n' or '\n'
+                                 for line in lines]))
+
     def dedent(self):
         """
         Decrease the current indentation level. Should only be used if
@@ -166,6 +201,66 @@ class SourceBuilder(object):
         """
         self.indent.dedent()
 
+    def mark(self):
+        """
+        Mark the current position in the generated source. Code can be
+        inserted at the returned mark later on using ``insert_at``.
+        Marks should be made at the start of a line.
+
+        Raises a ``TypeError`` if the buffer doesn't support marks, use
+        ``buffer=RopeBuffer`` to enable them. Marks are not supported when
+        filters or fingerprinting are used.
+
+        """
+        try:
+            mark = self._out.mark
+        except AttributeError:
+            raise TypeError('Buffer does not support marks.')
+        return mark(self.indent.level)
+
+    def insert_at(self, mark, code):
+        """
+        Insert one or more lines of code at ``mark``. Each line is indented
+        to the indentation level at the time the mark was made. Code
+        inserted at the same mark ends up in the order it was inserted.
+
+        """
+        indent = self.indent.indent_with * mark.level
+        lines = [line and indent + line or line for line in code.splitlines()]
+        self._out.insert(mark, '\n'.join(lines) + '\n')
+
+    def fingerprint(self, name=None):
+        """
+        Return the hex digest of the source written so far, or of the region
+        called ``name``. When filters are used an incomplete last line is
+        only included after ``end()``.
+
+        Raises a ``TypeError`` if fingerprinting is not enabled, use the
+        ``fingerprint`` argument to enable it.
+
+        """
+        try:
+            fingerprint = self._out.fingerprint
+        except AttributeError:
+            raise TypeError('Fingerprinting is not enabled.')
+        return fingerprint(name)
+
+    def region(self, name):
+        """
+        A context manager that fingerprints the source written inside the
+        context as a region called ``name``. Regions may be nested, but not
+        in a region of the same name. When filters are used regions have to
+        start and end at the start of a line.
+
+        Raises a ``TypeError`` if fingerprinting is not enabled. Raises a
+        ``ValueError`` if region ``name`` is already active or if filters
+        are used and the builder is not at the start of a line.
+
+        """
+        if not hasattr(self._out, 'fingerprint'):
+            raise TypeError('Fingerprinting is not enabled.')
+        return Region(self._out, name)
+
     def end(self):
         """
         Get the generated source and resets the indent level.
@@ -174,14 +269,162 @@ class SourceBuilder(object):
         self.indent.reset()
         return self._out.getvalue()
 
+    def write_to(self, fileobj):
+        """
+        Write the generated source to ``fileobj`` and resets the indent
+        level. Buffers that support it write their contents piece by piece
+        instead of building the complete source in memory first.
+
+        """
+        self.indent.reset()
+        write_to = getattr(self._out, 'write_to', None)
+        if write_to is None:
+            fileobj.write(self._out.getvalue())
+        else:
+            write_to(fileobj)
+
+    def checkpoint(self, path):
+        """
+        Save the state of the builder to the checkpoint file at ``path``,
+        so generation can be resumed using ``restore``. Only the source
+        written since the previous checkpoint to the same file is appended
+        to it. If a sink is used only its offset is saved. The state of
+        filters that have ``getstate`` and ``setstate`` methods is saved too,
+        it should be JSON serializable.
+
+        Each checkpoint is appended as a line of JSON followed by the source
+        it adds, so loading a checkpoint file never executes code.
+
+        The fingerprint is restored by hashing the saved source again, so a
+        sink can't be checkpointed when fingerprinting is enabled. Region
+        fingerprints are not restored.
+
+        Raises a ``TypeError`` if the buffer doesn't support checkpoints.
+        Raises a ``ValueError`` if filters are used and the builder is not
+        at the start of a line.
+
+        """
+        out = self._out
+        resume = self._checkpoint is not None and self._checkpoint[0] == path
+        filter_states = None
+        if isinstance(out, FilteredBuffer):
+            filter_states = out.getstate()
+            out = out.buffer
+        if isinstance(out, HashingBuffer) and hasattr(out, 'checkpoint'):
+            raise TypeError('Sinks do not support checkpoints when '
+                            'fingerprinting is enabled.')
+        if hasattr(out, 'checkpoint'):
+            offset = position = out.checkpoint()
+            delta = ''
+        elif hasattr(out, 'seek'):
+            offset = None
+            out.seek(resume and self._checkpoint[1] or 0)
+            delta = out.read()
+            position = out.tell()
+        else:
+            raise TypeError('Buffer does not support checkpoints.')
+        is_unicode = isinstance(delta, unicode)
+        if is_unicode:
+            delta = delta.encode('utf-8')
+        header = json.dumps({'size': len(delta), 'offset': offset,
+                             'unicode': is_unicode,
+                             'level': self.indent.level,
+                             'indent_with': self.indent.indent_with,
+                             'filters': filter_states},
+                            separators=(',', ':'))
+        f = open(path, resume and 'ab' or 'wb')
+        try:
+            f.write(header + '\n' + delta)
+        finally:
+            f.close()
+        self._checkpoint = (path, position)
+
+    @classmethod
+    def restore(cls, path, **kwargs):
+        """
+        Create a builder from the checkpoint file at ``path``. Any keyword
+        arguments are passed on to the constructor, the ``buffer`` should
+        be the same kind of buffer the checkpoint was made with. A sink
+        should write to the same file, opened for reading and writing.
+        An ``indent_with`` argument takes precedence over the one saved
+        in the checkpoint.
+
+        A checkpoint that was only partly written (because the process was
+        interrupted while writing it) is truncated off the file.
+
+        Raises a ``ValueError`` if the checkpoint file contains no complete
+        checkpoint.
+
+        """
+        deltas = []
+        record = None
+        end = 0
+        f = open(path, 'rb')
+        try:
+            while True:
+                header = f.readline()
+                if not header.endswith('\n'):
+                    break
+                try:
+                    header = json.loads(header)
+                except ValueError:
+                    break
+                delta = f.read(header['size'])
+                if len(delta) < header['size']:
+                    break
+                if header['unicode']:
+                    delta = delta.decode('utf-8')
+                deltas.append(delta)
+                record = header
+                end = f.tell()
+            f.seek(0, 2)
+            torn = f.tell() > end
+        finally:
+            f.close()
+        if torn:
+            f = open(path, 'r+b')
+            try:
+                f.truncate(end)
+            finally:
+                f.close()
+        if record is None:
+            raise ValueError('Checkpoint file contains no checkpoint.')
+        offset = record['offset']
+        level = record['level']
+        filter_states = record['filters']
+        indent_with = record['indent_with']
+        if isinstance(indent_with, unicode):
+            indent_with = indent_with.encode('utf-8')
+        kwargs.setdefault('indent_with', indent_with)
+        builder = cls(**kwargs)
+        out = builder._out
+        if isinstance(out, FilteredBuffer):
+            if filter_states is not None:
+                out.setstate(filter_states)
+            out = out.buffer
+        if offset is None:
+            out.write(''.join(deltas))
+            builder._checkpoint = (path, out.tell())
+        else:
+            out.resume(offset)
+            builder._checkpoint = (path, offset)
+        builder.indent.level = level
+        return builder
+
     def truncate(self):
         '''
         Discard generated source and memory buffer and resets the indent level.
+        Output a sink has written to its file is truncated away.
 
         '''
         if not self._out.closed:
-            self._out.close()
-        self._out = StringIO()
+            discard = getattr(self._out, 'discard', None)
+            if discard is None:
+                self._out.close()
+            else:
+                discard()
+        self._out = self._new_buffer()
+        self._checkpoint = None
         self.indent.reset()
 
     def close(self):
@@ -190,3 +433,11 @@ class SourceBuilder(object):
         Calls ``self.truncate()``.
         '''
         self.truncate()
+
+    def _new_buffer(self):
+        out = self._buffer()
+        if self._algorithm:
+            out = HashingBuffer(out, self._algorithm)
+        if self._filters:
+            out = FilteredBuffer(out, self._filters)
+        return out
@@ -0,0 +1,190 @@
+"""
+Compile text templates into functions that write to a SourceBuilder.
+
+A template is a piece of code with ``{name}`` placeholders. ``{name.attr}``
+looks up an attribute. Like ``str.format``, braces in the code have to be
+doubled: ``{{`` and ``}}`` are written as ``{`` and ``}``, any other brace
+is a syntax error.
+Lines containing only a directive control the output:
+
+- ``{% for name in items %}`` ... ``{% endfor %}`` repeats the lines in
+  between for every item, ``{% for key, value in items %}`` unpacks them.
+- ``{% if name %}`` ... ``{% else %}`` ... ``{% endif %}`` writes the lines
+  depending on the truth value of ``name`` (or ``not name``).
+
+The template is dedented and leading and trailing newlines are removed.
+Lines keep their indentation relative to the current indentation level of
+the builder.
+
+"""
+import re
+import textwrap
+from .pysourcebuilder import PySourceBuilder
+
+CACHE_SIZE = 128
+
+NAME = r'[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*'
+TOKEN = re.compile(r'\{\{|\}\}|\{(%s)\}|[{}]' % NAME)
+DIRECTIVE = re.compile(r'^\s*\{%\s*(.*?)\s*%\}\s*$')
+FOR = re.compile(r'^for\s+([A-Za-z_]\w*(?:\s*,\s*[A-Za-z_]\w*)*)\s+in\s+(%s)$'
+                 % NAME)
+IF = re.compile(r'^if\s+(not\s+)?(%s)$' % NAME)
+
+_cache = {}
+_tick = 0
+
+
+class TemplateSyntaxError(Exception):
+    """
+    Raised when a template can't be compiled.
+    """
+
+
+def compile_template(template):
+    """
+    Compile ``template`` into a function ``render(sb, context)`` that
+    writes the template to the SourceBuilder ``sb``, looking up the names
+    used in the template in the ``context`` dict.
+
+    Compiled templates are cached by their text. If more than
+    ``CACHE_SIZE`` templates are compiled the least recently used one is
+    dropped from the cache.
+
+    Raises a ``TemplateSyntaxError`` if the template is invalid.
+
+    """
+    global _tick
+    _tick = _tick + 1
+    entry = _cache.get(template)
+    if entry is None:
+        if len(_cache) >= CACHE_SIZE:
+            del _cache[min(_cache, key=lambda key: _cache[key][1])]
+        entry = _cache[template] = [_compile(template), _tick]
+    else:
+        entry[1] = _tick
+    return entry[0]
+
+
+def render(_sb, _template, **context):
+    """
+    Write ``_template`` to the SourceBuilder ``_sb``, the keyword arguments
+    are the names used in the template.
+
+    """
+    compile_template(_template)(_sb, context)
+
+
+def _compile(template):
+    compiler = _Compiler()
+    for lineno, line in enumerate(
+            textwrap.dedent(template).strip('\n').splitlines()):
+        directive = DIRECTIVE.match(line)
+        if directive is None:
+            compiler.line(line, lineno + 1)
+        else:
+            compiler.directive(directive.group(1), lineno + 1)
+    source = compiler.end()
+    namespace = {}
+    exec compile(source, '<template>', 'exec') in namespace
+    return namespace['render']
+
+
+class _Compiler(object):
+    """
+    Generates the source of the render function, consecutive lines are
+    written by a single ``writelines`` call.
+
+    """
+    def __init__(self):
+        self.sb = PySourceBuilder()
+        self.sb.writeln('def render(sb, context):')
+        self.sb.indent()
+        self.sb.writeln('writelines = sb.writelines')
+        self.lines = []
+        self.blocks = []
+        self.names = {}
+
+    def line(self, line, lineno):
+        parts = []
+        values = []
+        pos = 0
+        for match in TOKEN.finditer(line):
+            parts.append(line[pos:match.start()].replace('%', '%%'))
+            if len(match.group(0)) == 1:
+                raise TemplateSyntaxError(
+                    'Single %r on line %d, use %r instead.'
+                    % (match.group(0), lineno, match.group(0) * 2))
+            elif match.group(1) is None:
+                parts.append(match.group(0)[0])
+            else:
+                parts.append('%s')
+                values.append(self.lookup(match.group(1)))
+            pos = match.end()
+        parts.append(line[pos:].replace('%', '%%'))
+        if values:
+            self.lines.append('%r %% (%s,)' % (''.join(parts),
+                                                ', '.join(values)))
+        else:
+            self.lines.append(repr(''.join(parts).replace('%%', '%')))
+
+    def directive(self, directive, lineno):
+        self.flush()
+        match = FOR.match(directive)
+        if match is not None:
+            targets = [name.strip() for name in match.group(1).split(',')]
+            names = dict([(name, '_v%d_%s' % (len(self.blocks), name))
+                          for name in targets])
+            self.open('for', 'for %s in %s:' % (
+                ', '.join([names[name] for name in targets]),
+                self.lookup(match.group(2))), names)
+            return
+        match = IF.match(directive)
+        if match is not None:
+            self.open('if', 'if %s%s:' % (match.group(1) and 'not ' or '',
+                                          self.lookup(match.group(2))), {})
+        elif directive == 'else':
+            self.close(('if',), directive, lineno)
+            self.open('else', 'else:', {})
+        elif directive == 'endif':
+            self.close(('if', 'else'), directive, lineno)
+        elif directive == 'endfor':
+            self.close(('for',), directive, lineno)
+        else:
+            raise TemplateSyntaxError('Unknown directive %r on line %d.'
+                                      % (directive, lineno))
+
+    def lookup(self, name):
+        parts = name.split('.')
+        if parts[0] in self.names:
+            parts[0] = self.names[parts[0]]
+        else:
+            parts[0] = 'context[%r]' % parts[0]
+        return '.'.join(parts)
+
+    def open(self, kind, code, names):
+        self.sb.writeln(code)
+        self.sb.indent()
+        self.blocks.append((kind, self.sb.buffer.tell(), self.names))
+        self.names = dict(self.names)
+        self.names.update(names)
+
+    def close(self, kinds, directive, lineno):
+        if not self.blocks or self.blocks[-1][0] not in kinds:
+            raise TemplateSyntaxError('Unexpected %s on line %d.'
+                                      % (directive, lineno))
+        kind, start, self.names = self.blocks.pop()
+        if self.sb.buffer.tell() == start:
+            self.sb.writeln('pass')
+        self.sb.dedent()
+
+    def flush(self):
+        if self.lines:
+            self.sb.writeln('writelines((%s,))' % ', '.join(self.lines))
+            self.lines = []
+
+    def end(self):
+        self.flush()
+        if self.blocks:
+            raise TemplateSyntaxError('Missing end%s.' % (
+                self.blocks[-1][0] == 'for' and 'for' or 'if'))
+        return self.sb.end()
@@ -0,0 +1,200 @@
+from __future__ import with_statement
+import os
+import tempfile
+import unittest
+from functools import partial
+from StringIO import StringIO
+from sourcebuilder import (CollapseBlankLines, CompressedSink,
+                           InternedBuffer, LineLengthCheck, PySourceBuilder,
+                           Sink, SourceBuilder, strip_trailing_whitespace)
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+
+    def test_restore(self):
+        sb = PySourceBuilder(indent_with='\t')
+        sb.writeln('class Foo(object):')
+        sb.indent()
+        sb.writeln('pass')
+        sb.checkpoint(self.path)
+        sb.writeln('lost = True')
+        sb = PySourceBuilder.restore(self.path)
+        self.assertTrue(isinstance(sb, PySourceBuilder))
+        self.assertEqual('\t', sb.indent.indent_with)
+        self.assertEqual(1, sb.indent.level)
+        sb.writeln('x = 1')
+        self.assertEqual('class Foo(object):\n\tpass\n\tx = 1\n', sb.end())
+
+    def test_restore_indent_with(self):
+        sb = SourceBuilder()
+        sb.indent()
+        sb.writeln('a')
+        sb.checkpoint(self.path)
+        sb = SourceBuilder.restore(self.path, indent_with='\t')
+        sb.writeln('b')
+        self.assertEqual('    a\n\tb\n', sb.end())
+
+    def test_checkpoint_appends_delta(self):
+        sb = SourceBuilder()
+        sb.writeln('a' * 1000)
+        sb.checkpoint(self.path)
+        size = os.path.getsize(self.path)
+        sb.writeln('b')
+        sb.checkpoint(self.path)
+        self.assertTrue(os.path.getsize(self.path) - size < 100)
+        self.assertEqual('a' * 1000 + '\nb\n',
+                         SourceBuilder.restore(self.path).end())
+
+    def test_checkpoint_after_restore(self):
+        sb = SourceBuilder()
+        sb.writeln('a')
+        sb.checkpoint(self.path)
+        sb = SourceBuilder.restore(self.path)
+        sb.writeln('b')
+        sb.checkpoint(self.path)
+        self.assertEqual('a\nb\n', SourceBuilder.restore(self.path).end())
+
+    def test_checkpoint_to_other_path_starts_over(self):
+        fd, other = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, other)
+        sb = SourceBuilder()
+        sb.writeln('a')
+        sb.checkpoint(other)
+        sb.writeln('b')
+        sb.checkpoint(self.path)
+        self.assertEqual('a\nb\n', SourceBuilder.restore(self.path).end())
+
+    def test_restore_empty(self):
+        self.assertRaises(ValueError, SourceBuilder.restore, self.path)
+
+    def test_restore_torn_checkpoint(self):
+        sb = SourceBuilder()
+        sb.writeln('a')
+        sb.checkpoint(self.path)
+        sb.writeln('b')
+        sb.checkpoint(self.path)
+        size = os.path.getsize(self.path)
+        with open(self.path, 'r+b') as f:
+            f.truncate(size - 1)
+        sb = SourceBuilder.restore(self.path)
+        sb.writeln('c')
+        sb.checkpoint(self.path)
+        self.assertEqual('a\nc\n', SourceBuilder.restore(self.path).end())
+
+    def test_restore_unicode(self):
+        sb = SourceBuilder(buffer=StringIO)
+        sb.writeln(u'caf\xe9')
+        sb.checkpoint(self.path)
+        sb = SourceBuilder.restore(self.path, buffer=StringIO)
+        self.assertEqual(u'caf\xe9\n', sb.end())
+
+    def test_not_supported(self):
+        sb = SourceBuilder(buffer=InternedBuffer)
+        self.assertRaises(TypeError, sb.checkpoint, self.path)
+        sb = SourceBuilder(buffer=CompressedSink)
+        self.assertRaises(TypeError, sb.checkpoint, self.path)
+        sb = SourceBuilder(buffer=Sink)
+        self.assertRaises(TypeError, sb.checkpoint, self.path)
+
+
+class TestSinkCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+        fd, self.out = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, self.out)
+
+    def test_restore(self):
+        f = open(self.out, 'wb')
+        sb = SourceBuilder(buffer=partial(Sink, f, chunk_size=1))
+        sb.writeln('def foo():')
+        sb.indent()
+        sb.checkpoint(self.path)
+        sb.writeln('lost = True')
+        f.close()
+        f = open(self.out, 'r+b')
+        sb = SourceBuilder.restore(self.path, buffer=partial(Sink, f))
+        sb.writeln('pass')
+        sb.end()
+        f.close()
+        with open(self.out) as f:
+            self.assertEqual('def foo():\n    pass\n', f.read())
+
+    def test_restore_after_header(self):
+        f = open(self.out, 'wb')
+        f.write('# header\n')
+        sb = SourceBuilder(buffer=partial(Sink, f, chunk_size=1))
+        sb.writeln('a = 1')
+        sb.checkpoint(self.path)
+        sb.writeln('lost = True')
+        f.close()
+        f = open(self.out, 'r+b')
+        sb = SourceBuilder.restore(self.path, buffer=partial(Sink, f))
+        sb.writeln('b = 2')
+        sb.end()
+        f.close()
+        with open(self.out) as f:
+            self.assertEqual('# header\na = 1\nb = 2\n', f.read())
+
+
+class TestFilterCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+
+    def test_refuses_incomplete_line(self):
+        sb = SourceBuilder(filters=[strip_trailing_whitespace])
+        sb.writeln('a')
+        sb.write('x = ')
+        self.assertRaises(ValueError, sb.checkpoint, self.path)
+        sb.writeln('1')
+        sb.checkpoint(self.path)
+        sb = SourceBuilder.restore(self.path,
+                                   filters=[strip_trailing_whitespace])
+        self.assertEqual('a\nx = 1\n', sb.end())
+
+    def test_restores_filter_state(self):
+        check = LineLengthCheck(max_length=3)
+        sb = SourceBuilder(filters=[CollapseBlankLines(1), check])
+        sb.writeln('aaaa')
+        sb.writeln()
+        sb.checkpoint(self.path)
+        check = LineLengthCheck(max_length=3)
+        sb = SourceBuilder.restore(self.path,
+                                   filters=[CollapseBlankLines(1), check])
+        sb.writeln()
+        sb.writeln('bbbb')
+        self.assertEqual('aaaa\n\nbbbb\n', sb.end())
+        self.assertEqual([(1, 4), (3, 4)], check.violations)
+
+    def test_restores_filter_state_with_sink(self):
+        fd, out = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, out)
+        f = open(out, 'wb')
+        sb = SourceBuilder(buffer=partial(Sink, f),
+                           filters=[CollapseBlankLines(1)])
+        sb.writeln('a')
+        sb.writeln()
+        sb.checkpoint(self.path)
+        f.close()
+        f = open(out, 'r+b')
+        sb = SourceBuilder.restore(self.path, buffer=partial(Sink, f),
+                                   filters=[CollapseBlankLines(1)])
+        sb.writeln()
+        sb.writeln('b')
+        sb.end()
+        f.close()
+        with open(out) as f:
+            self.assertEqual('a\n\nb\n', f.read())
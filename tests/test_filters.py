@@ -0,0 +1,117 @@
+from __future__ import with_statement
+import unittest
+from cStringIO import StringIO
+from sourcebuilder import (CollapseBlankLines, InternedBuffer,
+                           LineLengthCheck, PySourceBuilder, RopeBuffer, Sink,
+                           SourceBuilder, normalize_line_endings,
+                           strip_trailing_whitespace)
+from sourcebuilder.filters import FilteredBuffer
+
+
+class TestFilters(unittest.TestCase):
+
+    def test_strip_trailing_whitespace(self):
+        self.assertEqual('  foo', strip_trailing_whitespace('  foo \t'))
+
+    def test_normalize_line_endings(self):
+        self.assertEqual('foo', normalize_line_endings('foo\r'))
+
+    def test_collapse_blank_lines(self):
+        stage = CollapseBlankLines(max_blank=1)
+        self.assertEqual(['a', '', None, 'b', ' ', None],
+                         [stage(line) for line in ['a', '', '', 'b', ' ', '']])
+        stage.reset()
+        self.assertEqual(0, stage.blank)
+
+    def test_line_length_check(self):
+        stage = LineLengthCheck(max_length=3)
+        self.assertEqual(['abc', 'abcd', 'a'],
+                         [stage(line) for line in ['abc', 'abcd', 'a']])
+        self.assertEqual([(2, 4)], stage.violations)
+        stage.reset()
+        self.assertEqual([], stage.violations)
+        self.assertEqual(0, stage.lineno)
+
+
+class TestFilteredBuffer(unittest.TestCase):
+
+    def test_filters_complete_lines(self):
+        buf = FilteredBuffer(StringIO(), [str.upper])
+        buf.write('foo')
+        self.assertEqual('', buf.buffer.getvalue())
+        buf.write('\nbar\nb')
+        self.assertEqual('FOO\nBAR\n', buf.buffer.getvalue())
+        buf.write('az')
+        self.assertEqual('FOO\nBAR\nBAZ', buf.getvalue())
+
+    def test_drops_lines(self):
+        buf = FilteredBuffer(StringIO(), [lambda line: line or None])
+        buf.write('a\n\n\nb\n')
+        self.assertEqual('a\nb\n', buf.getvalue())
+
+    def test_delegates_to_buffer(self):
+        buf = FilteredBuffer(InternedBuffer(), [])
+        buf.write('a\na\n')
+        self.assertEqual(2.0, buf.dedup_ratio)
+
+    def test_write_to(self):
+        buf = FilteredBuffer(InternedBuffer(), [str.upper])
+        buf.write('a\nb')
+        out = StringIO()
+        buf.write_to(out)
+        self.assertEqual('A\nB', out.getvalue())
+
+    def test_marks_not_supported(self):
+        buf = FilteredBuffer(RopeBuffer(), [])
+        self.assertRaises(TypeError, buf.mark)
+        mark = RopeBuffer().mark()
+        self.assertRaises(TypeError, buf.insert, mark, 'foo')
+
+    def test_state(self):
+        stage = CollapseBlankLines()
+        buf = FilteredBuffer(StringIO(), [stage, strip_trailing_whitespace])
+        buf.write('\n')
+        self.assertEqual([1, None], buf.getstate())
+        buf.setstate([2, None])
+        self.assertEqual(2, stage.blank)
+        buf.write('a')
+        self.assertRaises(ValueError, buf.getstate)
+
+    def test_close(self):
+        buf = FilteredBuffer(StringIO(), [])
+        buf.close()
+        self.assertTrue(buf.closed)
+
+
+class TestSourceBuilderFilters(unittest.TestCase):
+
+    def test_pipeline(self):
+        check = LineLengthCheck(max_length=20)
+        sb = PySourceBuilder(filters=[normalize_line_endings,
+                                      strip_trailing_whitespace,
+                                      CollapseBlankLines(), check])
+        with sb.block('class Foo(object): ', 3):
+            sb.writeln('x = 1\r')
+            sb.writeln()
+            sb.writeln('    ')
+            sb.writeln()
+            sb.writeln('y = "a very long line"')
+        self.assertEqual('\n\nclass Foo(object):\n    x = 1\n\n\n'
+                         '    y = "a very long line"\n', sb.end())
+        self.assertEqual([(7, 26)], check.violations)
+
+    def test_truncate_resets_filters(self):
+        check = LineLengthCheck(max_length=1)
+        sb = SourceBuilder(filters=[check])
+        sb.writeln('foo')
+        sb.truncate()
+        self.assertEqual([], check.violations)
+
+    def test_sink(self):
+        out = StringIO()
+        sb = SourceBuilder(buffer=lambda: Sink(out),
+                           filters=[strip_trailing_whitespace])
+        sb.writeln('foo  ')
+        sb.write('bar  ')
+        sb.end()
+        self.assertEqual('foo\nbar', out.getvalue())
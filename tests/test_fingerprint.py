@@ -0,0 +1,153 @@
+from __future__ import with_statement
+import hashlib
+import os
+import tempfile
+import unittest
+from cStringIO import StringIO
+from functools import partial
+from sourcebuilder import (PySourceBuilder, RopeBuffer, Sink, SourceBuilder,
+                           strip_trailing_whitespace)
+from sourcebuilder.fingerprint import HashingBuffer
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class TestHashingBuffer(unittest.TestCase):
+
+    def test_fingerprint(self):
+        buf = HashingBuffer(Sink())
+        buf.write('foo')
+        buf.write(u'\xe9')
+        self.assertEqual('foo\xc3\xa9', buf.getvalue())
+        self.assertEqual(sha256('foo\xc3\xa9'), buf.fingerprint())
+
+    def test_algorithm(self):
+        buf = HashingBuffer(StringIO(), 'md5')
+        buf.write('foo')
+        self.assertEqual(hashlib.md5('foo').hexdigest(), buf.fingerprint())
+        buf = HashingBuffer(StringIO(), hashlib.sha1)
+        buf.write('foo')
+        self.assertEqual(hashlib.sha1('foo').hexdigest(), buf.fingerprint())
+
+    def test_regions(self):
+        buf = HashingBuffer(StringIO())
+        buf.write('a')
+        buf.start_region('outer')
+        buf.write('b')
+        buf.start_region('inner')
+        buf.write('c')
+        buf.end_region('inner')
+        buf.write('d')
+        self.assertEqual(sha256('bcd'), buf.fingerprint('outer'))
+        self.assertEqual(sha256('c'), buf.fingerprint('inner'))
+        self.assertRaises(KeyError, buf.fingerprint, 'foo')
+
+    def test_nested_region_with_same_name(self):
+        buf = HashingBuffer(StringIO())
+        buf.start_region('r')
+        self.assertRaises(ValueError, buf.start_region, 'r')
+        buf.end_region('r')
+        buf.start_region('r')
+        buf.write('a')
+        buf.end_region('r')
+        buf.write('b')
+        self.assertEqual(sha256('a'), buf.fingerprint('r'))
+        self.assertEqual([], buf._active)
+
+    def test_marks_not_supported(self):
+        buf = HashingBuffer(RopeBuffer())
+        self.assertRaises(TypeError, buf.mark)
+        mark = RopeBuffer().mark()
+        self.assertRaises(TypeError, buf.insert, mark, 'foo')
+
+
+class TestSourceBuilderFingerprint(unittest.TestCase):
+
+    def test_fingerprint(self):
+        sb = PySourceBuilder(fingerprint='sha256')
+        with sb.region('class'):
+            with sb.block('class Foo(object):', 2):
+                with sb.region('init'):
+                    with sb.block('def __init__(self):'):
+                        sb.writeln('pass')
+        sb.writeln('foo = Foo()')
+        source = sb.end()
+        self.assertEqual(sha256(source), sb.fingerprint())
+        self.assertEqual(sha256(source[:source.index('foo')]),
+                         sb.fingerprint('class'))
+        self.assertEqual(sha256('    def __init__(self):\n        pass\n'),
+                         sb.fingerprint('init'))
+
+    def test_fingerprint_after_filters(self):
+        sb = SourceBuilder(fingerprint='sha256',
+                           filters=[strip_trailing_whitespace])
+        sb.writeln('foo   ')
+        self.assertEqual(sha256('foo\n'), sb.fingerprint())
+
+    def test_region_with_filters(self):
+        sb = SourceBuilder(fingerprint='sha256',
+                           filters=[strip_trailing_whitespace])
+        with sb.region('r'):
+            sb.writeln('abc  ')
+        sb.writeln('def')
+        self.assertEqual(sha256('abc\n'), sb.fingerprint('r'))
+
+    def test_region_with_filters_on_incomplete_line(self):
+        sb = SourceBuilder(fingerprint='sha256',
+                           filters=[strip_trailing_whitespace])
+        sb.write('abc')
+        self.assertRaises(ValueError, sb.region('r').__enter__)
+        sb.writeln()
+        region = sb.region('r')
+        region.__enter__()
+        sb.write('def')
+        self.assertRaises(ValueError, region.__exit__, None, None, None)
+
+    def test_region_with_filters_keeps_exception(self):
+        sb = SourceBuilder(fingerprint='sha256',
+                           filters=[strip_trailing_whitespace])
+
+        def fail():
+            with sb.region('r'):
+                sb.write('abc')
+                raise KeyError('r')
+        self.assertRaises(KeyError, fail)
+        sb.writeln()
+        with sb.region('r'):
+            sb.writeln('def')
+        self.assertEqual(sha256('def\n'), sb.fingerprint('r'))
+
+    def test_checkpoint_with_sink_not_supported(self):
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        sb = SourceBuilder(buffer=partial(Sink, StringIO()),
+                           fingerprint='sha256')
+        self.assertRaises(TypeError, sb.checkpoint, path)
+
+    def test_checkpoint_restores_fingerprint(self):
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        sb = SourceBuilder(fingerprint='sha256')
+        sb.writeln('a')
+        sb.checkpoint(path)
+        sb = SourceBuilder.restore(path, fingerprint='sha256')
+        sb.writeln('b')
+        self.assertEqual(sha256('a\nb\n'), sb.fingerprint())
+
+    def test_truncate_resets_fingerprint(self):
+        sb = SourceBuilder(fingerprint='sha256')
+        sb.writeln('foo')
+        sb.truncate()
+        self.assertEqual(sha256(''), sb.fingerprint())
+
+    def test_not_enabled(self):
+        sb = SourceBuilder()
+        self.assertRaises(TypeError, sb.fingerprint)
+        self.assertRaises(TypeError, sb.region, 'foo')
+        sb = SourceBuilder(filters=[strip_trailing_whitespace])
+        self.assertRaises(TypeError, sb.fingerprint)
+        self.assertRaises(TypeError, sb.region, 'foo')
@@ -41,3 +41,6 @@ class TestIndentManager(unittest.TestCase):
         im.reset()
         self.assertEquals(0, im.level)
 
+    def test_slots(self):
+        im = IndentManager()
+        self.assertRaises(AttributeError, setattr, im, 'foo', 'bar')
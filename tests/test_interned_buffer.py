@@ -0,0 +1,81 @@
+from __future__ import with_statement
+import unittest
+from cStringIO import StringIO
+from sourcebuilder import InternedBuffer, PySourceBuilder, SourceBuilder
+from sourcebuilder import buffers
+
+
+class TestInternedBuffer(unittest.TestCase):
+
+    def test_write_getvalue(self):
+        buf = InternedBuffer()
+        buf.write('foo\nbar\n')
+        buf.write('foo\n')
+        buf.write('ba')
+        self.assertEqual('foo\nbar\nfoo\nba', buf.getvalue())
+
+    def test_lines_are_stored_once(self):
+        buf = InternedBuffer()
+        for i in range(10):
+            buf.write('    ')
+            buf.write('pass')
+            buf.write('\n')
+        self.assertEqual(['    pass\n'], buf._pool)
+        self.assertEqual(10, len(buf._doc))
+        self.assertEqual(10.0, buf.dedup_ratio)
+
+    def test_dedup_ratio_empty(self):
+        self.assertEqual(1.0, InternedBuffer().dedup_ratio)
+
+    def test_write_to(self):
+        self.patch_write_to_lines(2)
+        buf = InternedBuffer()
+        buf.write('a\nb\na\nb\na\nc')
+        out = StringIO()
+        buf.write_to(out)
+        self.assertEqual('a\nb\na\nb\na\nc', out.getvalue())
+
+    def test_close(self):
+        buf = InternedBuffer()
+        buf.write('foo\n')
+        buf.close()
+        self.assertTrue(buf.closed)
+        self.assertEqual('', buf.getvalue())
+
+    def patch_write_to_lines(self, value):
+        original = buffers.WRITE_TO_LINES
+        buffers.WRITE_TO_LINES = value
+
+        def restore():
+            buffers.WRITE_TO_LINES = original
+        self.addCleanup(restore)
+
+
+class TestSourceBuilderInterned(unittest.TestCase):
+
+    def test_interned_output_matches(self):
+        def generate(sb):
+            for i in range(3):
+                with sb.block('class Foo%d(object):' % i, 2):
+                    with sb.block('def __init__(self):'):
+                        sb.writeln('pass')
+            return sb.end()
+        sb = PySourceBuilder(buffer=InternedBuffer)
+        self.assertEqual(generate(PySourceBuilder()), generate(sb))
+        self.assertTrue(sb.buffer.dedup_ratio > 1)
+
+    def test_write_to(self):
+        sb = SourceBuilder(buffer=InternedBuffer)
+        sb.indent()
+        sb.writeln('pass')
+        out = StringIO()
+        sb.write_to(out)
+        self.assertEqual('    pass\n', out.getvalue())
+        self.assertEqual(0, sb.indent.level)
+
+    def test_write_to_default_buffer(self):
+        sb = SourceBuilder()
+        sb.writeln('pass')
+        out = StringIO()
+        sb.write_to(out)
+        self.assertEqual('pass\n', out.getvalue())
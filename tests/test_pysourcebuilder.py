@@ -107,3 +107,21 @@ class TestPySourceBuilder(unittest.TestCase):
         Integer ac velit nisl. Etiam eu nisl orci. Lorem ipsum dolor sit amet.
         ''')
         self.assertEquals(INDENTED_DOCSTRING, sb.end())
+
+    def test_block_dedents_on_exception(self):
+        sb = PySourceBuilder()
+
+        def fail():
+            with sb.block('if True:'):
+                raise KeyError('foo')
+        self.assertRaises(KeyError, fail)
+        self.assertEquals(0, sb.indent.level)
+
+    def test_block_can_be_reused(self):
+        sb = PySourceBuilder()
+        block = sb.block('if True:', 1)
+        for i in range(2):
+            with block:
+                sb.writeln('pass')
+        self.assertEquals('\nif True:\n    pass\n\nif True:\n    pass\n',
+                          sb.end())
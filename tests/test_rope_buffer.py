@@ -0,0 +1,113 @@
+from __future__ import with_statement
+import unittest
+from cStringIO import StringIO
+from sourcebuilder import PySourceBuilder, RopeBuffer, SourceBuilder
+
+REGISTRY = '''REGISTRY = [
+    'Foo',
+    'Bar',
+]
+
+
+class Foo(object):
+    pass
+
+
+class Bar(object):
+    pass
+'''
+
+SLOTS = '''class Point(object):
+    __slots__ = ('x', 'y')
+
+    def __init__(self):
+        self.x = 0
+        self.y = 0
+'''
+
+
+class TestRopeBuffer(unittest.TestCase):
+
+    def test_write_getvalue(self):
+        buf = RopeBuffer()
+        buf.write('foo')
+        buf.write('bar')
+        self.assertEqual('foobar', buf.getvalue())
+
+    def test_insert_at_mark(self):
+        buf = RopeBuffer()
+        buf.write('a')
+        mark = buf.mark()
+        buf.write('d')
+        buf.insert(mark, 'b')
+        buf.insert(mark, 'c')
+        self.assertEqual('abcd', buf.getvalue())
+
+    def test_write_to(self):
+        buf = RopeBuffer()
+        buf.write('a')
+        mark = buf.mark()
+        buf.write('c')
+        buf.insert(mark, 'b')
+        out = StringIO()
+        buf.write_to(out)
+        self.assertEqual('abc', out.getvalue())
+
+    def test_close(self):
+        buf = RopeBuffer()
+        buf.write('foo')
+        buf.close()
+        self.assertTrue(buf.closed)
+        self.assertEqual('', buf.getvalue())
+
+
+class TestSourceBuilderMarks(unittest.TestCase):
+
+    def test_insert_at(self):
+        sb = PySourceBuilder(buffer=RopeBuffer)
+        sb.writeln('REGISTRY = [')
+        with sb.indent:
+            registry = sb.mark()
+        sb.writeln(']')
+        for klass in ['Foo', 'Bar']:
+            with sb.block('class %s(object):' % klass, 2):
+                sb.writeln('pass')
+            sb.insert_at(registry, "'%s'," % klass)
+        self.assertEqual(REGISTRY, sb.end())
+
+    def test_insert_at_reindents_lines(self):
+        sb = PySourceBuilder(buffer=RopeBuffer)
+        with sb.block('class Point(object):'):
+            slots = sb.mark()
+            with sb.block('def __init__(self):', 1):
+                sb.writeln('self.x = 0')
+                sb.writeln('self.y = 0')
+        sb.insert_at(slots, "__slots__ = ('x', 'y')")
+        self.assertEqual(SLOTS, sb.end())
+
+    def test_insert_at_multiple_lines(self):
+        sb = SourceBuilder(buffer=RopeBuffer)
+        sb.indent()
+        mark = sb.mark()
+        sb.dedent()
+        sb.writeln('end')
+        sb.insert_at(mark, 'foo\n\n  bar')
+        self.assertEqual('    foo\n\n      bar\nend\n', sb.end())
+
+    def test_truncate_discards_marks(self):
+        sb = SourceBuilder(buffer=RopeBuffer)
+        sb.writeln('foo')
+        sb.mark()
+        sb.truncate()
+        sb.writeln('bar')
+        self.assertEqual('bar\n', sb.end())
+
+    def test_mark_not_supported(self):
+        sb = SourceBuilder()
+        self.assertRaises(TypeError, sb.mark)
+
+    def test_mark_not_supported_with_filters_or_fingerprint(self):
+        sb = SourceBuilder(buffer=RopeBuffer, filters=[str.rstrip])
+        self.assertRaises(TypeError, sb.mark)
+        sb = SourceBuilder(buffer=RopeBuffer, fingerprint='sha256')
+        self.assertRaises(TypeError, sb.mark)
@@ -0,0 +1,133 @@
+from __future__ import with_statement
+import gzip
+import os
+import tempfile
+import unittest
+import zlib
+from cStringIO import StringIO
+from functools import partial
+from sourcebuilder import CompressedSink, PySourceBuilder, Sink, SourceBuilder
+from sourcebuilder import sinks
+
+
+def generate(sb):
+    for i in range(100):
+        with sb.block('class Foo%d(object):' % i, 2):
+            with sb.block('def __init__(self):'):
+                sb.writeln('pass')
+    return sb.end()
+
+SOURCE = generate(PySourceBuilder())
+
+
+class TestSink(unittest.TestCase):
+
+    def test_in_memory(self):
+        self.assertEqual(SOURCE, generate(PySourceBuilder(buffer=Sink)))
+
+    def test_writes_in_chunks(self):
+        out = StringIO()
+        sink = Sink(out, chunk_size=4)
+        sink.write('foo')
+        self.assertEqual('', out.getvalue())
+        sink.write('bar')
+        self.assertEqual('foobar', out.getvalue())
+        self.assertEqual(6, sink.offset)
+        sink.write('baz')
+        self.assertEqual(None, sink.getvalue())
+        self.assertEqual('foobarbaz', out.getvalue())
+
+    def test_encodes_unicode(self):
+        sink = Sink()
+        sink.write(u'\xe9')
+        self.assertEqual('\xc3\xa9', sink.getvalue())
+
+    def test_write_after_finish(self):
+        sink = Sink()
+        sink.getvalue()
+        self.assertRaises(ValueError, sink.write, 'foo')
+        self.assertRaises(ValueError, sink.flush)
+
+    def test_builder_write_after_end(self):
+        sb = SourceBuilder(buffer=Sink)
+        sb.writeln('a')
+        sb.end()
+        self.assertRaises(ValueError, sb.writeln, 'b')
+
+    def test_discard(self):
+        out = StringIO()
+        out.write('# header\n')
+        sink = Sink(out, chunk_size=1)
+        sink.write('foo\n')
+        sink.write('ba')
+        sink.discard()
+        self.assertTrue(sink.closed)
+        self.assertEqual('# header\n', out.getvalue())
+        self.assertRaises(ValueError, sink.write, 'foo')
+
+    def test_truncate_discards_output(self):
+        out = StringIO()
+        sb = SourceBuilder(buffer=partial(Sink, out, chunk_size=1))
+        sb.writeln('old')
+        sb.truncate()
+        sb.writeln('new')
+        sb.end()
+        self.assertEqual('new\n', out.getvalue())
+
+    def test_write_to(self):
+        sink = Sink()
+        sink.write('foo')
+        out = StringIO()
+        sink.write_to(out)
+        self.assertEqual('foo', out.getvalue())
+
+    def test_write_to_file_sink(self):
+        sb = SourceBuilder(buffer=partial(Sink, StringIO()))
+        sb.writeln('a')
+        self.assertRaises(TypeError, sb.write_to, StringIO())
+
+    def test_close_keeps_fileobj_open(self):
+        out = StringIO()
+        sink = Sink(out)
+        sink.write('foo')
+        sink.close()
+        self.assertTrue(sink.closed)
+        self.assertEqual('foo', out.getvalue())
+
+
+class TestCompressedSink(unittest.TestCase):
+
+    def test_gzip_in_memory(self):
+        data = generate(PySourceBuilder(buffer=CompressedSink))
+        self.assertEqual(SOURCE, gzip.GzipFile(fileobj=StringIO(data)).read())
+
+    def test_zlib_in_memory(self):
+        sb = PySourceBuilder(buffer=partial(CompressedSink, method='zlib'))
+        self.assertEqual(SOURCE, zlib.decompress(generate(sb)))
+
+    def test_gzip_file(self):
+        fd, path = tempfile.mkstemp()
+        self.addCleanup(os.remove, path)
+        f = os.fdopen(fd, 'wb')
+        sb = PySourceBuilder(buffer=partial(CompressedSink, f,
+                                            chunk_size=1024))
+        self.assertEqual(None, generate(sb))
+        f.close()
+        self.assertEqual(SOURCE, gzip.open(path).read())
+
+    @unittest.skipIf(sinks.lzma is None, 'lzma is not available')
+    def test_lzma_in_memory(self):
+        sb = PySourceBuilder(buffer=partial(CompressedSink, method='lzma'))
+        self.assertEqual(SOURCE, sinks.lzma.decompress(generate(sb)))
+
+    def test_unknown_method(self):
+        self.assertRaises(ValueError, CompressedSink, method='rar')
+
+    def test_compresses_while_writing(self):
+        out = StringIO()
+        sink = CompressedSink(out, method='zlib', chunk_size=1)
+        for i in range(10000):
+            sink.write('x = %d\n' % i)
+        self.assertFalse(sink.finished)
+        self.assertTrue(sink.offset > 0)
+        self.assertEqual(sink.offset, len(out.getvalue()))
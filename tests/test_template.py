@@ -0,0 +1,139 @@
+from __future__ import with_statement
+import unittest
+from sourcebuilder import (PySourceBuilder, SourceBuilder,
+                           TemplateSyntaxError, compile_template, render)
+from sourcebuilder import template
+
+PROPERTIES = '''
+{% for name in names %}
+@property
+def {name}(self):
+    return self._{name}
+
+{% endfor %}
+'''
+
+HELLO_CLASS = '''class Hello(object):
+    @property
+    def what(self):
+        return self._what
+
+    @property
+    def who(self):
+        return self._who
+
+'''
+
+
+class TestTemplate(unittest.TestCase):
+
+    def test_render(self):
+        sb = SourceBuilder()
+        render(sb, 'print({what})', what='"Hello"')
+        self.assertEqual('print("Hello")\n', sb.end())
+
+    def test_respects_indent(self):
+        sb = PySourceBuilder()
+        with sb.block('class Hello(object):'):
+            render(sb, PROPERTIES, names=['what', 'who'])
+        self.assertEqual(HELLO_CLASS, sb.end())
+
+    def test_attribute_lookup(self):
+        sb = SourceBuilder()
+        render(sb, 'class {name}({base.__name__}):', name='Foo', base=object)
+        self.assertEqual('class Foo(object):\n', sb.end())
+
+    def test_if_else(self):
+        tpl = '''
+        {% if not value %}
+        pass
+        {% else %}
+        return {value}
+        {% endif %}
+        '''
+        sb = SourceBuilder()
+        render(sb, tpl, value=None)
+        render(sb, tpl, value=1)
+        self.assertEqual('pass\nreturn 1\n', sb.end())
+
+    def test_unpacking_loop(self):
+        sb = SourceBuilder()
+        render(sb, '''
+        {% for key, value in items %}
+        {key} = {value}
+        {% endfor %}
+        ''', items=[('a', 1), ('b', 2)])
+        self.assertEqual('a = 1\nb = 2\n', sb.end())
+
+    def test_nested_loop_reusing_name(self):
+        sb = SourceBuilder()
+        render(sb, '''
+        {% for x in xs %}
+        {% for x in x %}
+        {x}
+        {% endfor %}
+        {x}
+        {% endfor %}
+        ''', xs=[[1, 2]])
+        self.assertEqual('1\n2\n[1, 2]\n', sb.end())
+
+    def test_names_of_arguments(self):
+        sb = SourceBuilder()
+        render(sb, '{sb} {template}', sb='a', template='b')
+        self.assertEqual('a b\n', sb.end())
+
+    def test_empty_loop(self):
+        sb = SourceBuilder()
+        render(sb, '{% for x in items %}\n{% endfor %}', items=[1])
+        self.assertEqual('', sb.end())
+
+    def test_escapes(self):
+        sb = SourceBuilder()
+        render(sb, "d = {{'{key}': 100%}}", key='a')
+        self.assertEqual("d = {'a': 100%}\n", sb.end())
+
+    def test_nested_dict_literal(self):
+        sb = SourceBuilder()
+        render(sb, "d = {{'a': {{'b': {x}}}}}", x=1)
+        self.assertEqual("d = {'a': {'b': 1}}\n", sb.end())
+
+    def test_blank_lines_are_not_indented(self):
+        sb = SourceBuilder()
+        sb.indent()
+        render(sb, 'a\n\nb')
+        self.assertEqual('    a\n\n    b\n', sb.end())
+
+    def test_syntax_errors(self):
+        for tpl in ['{% while x %}', '{% endfor %}', '{% for x in y %}',
+                    '{% if x %}\n{% endfor %}', '{% else %}',
+                    'd = {}', "d = {{'a': {{'b': {x}}}}", "d = {'b': {x}}}",
+                    '{1}']:
+            self.assertRaises(TemplateSyntaxError, compile_template, tpl)
+
+    def test_cached(self):
+        self.assertTrue(compile_template(PROPERTIES) is
+                        compile_template(PROPERTIES))
+
+    def test_cache_drops_least_recently_used(self):
+        original = template.CACHE_SIZE
+        template.CACHE_SIZE = 2
+
+        def restore():
+            template.CACHE_SIZE = original
+        self.addCleanup(restore)
+        template._cache.clear()
+        first = compile_template('a')
+        compile_template('b')
+        compile_template('a')
+        compile_template('c')
+        self.assertEqual(['a', 'c'], sorted(template._cache))
+        self.assertTrue(first is compile_template('a'))
+
+
+class TestWritelines(unittest.TestCase):
+
+    def test_writelines(self):
+        sb = SourceBuilder()
+        sb.indent()
+        sb.writelines(['a', '', 'b'])
+        self.assertEqual('    a\n\n    b\n', sb.end())